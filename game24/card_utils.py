@@ -9,7 +9,7 @@ RANK_TO_VALUE = {
 }
 VALUE_TO_RANK = {1: "A", 11: "J", 12: "Q", 13: "K"}
 
-def rank_to_value(rank: str) -> int:
+def _rank_to_value_slow(rank) -> int:
     r = str(rank).strip().strip('"').strip("'")
     if r in RANK_TO_VALUE:
         return RANK_TO_VALUE[r]
@@ -17,6 +17,16 @@ def rank_to_value(rank: str) -> int:
         return int(r)
     raise ValueError(f"Unrecognized rank: {rank}")
 
+# Every common spelling of a rank mapped straight to its value, so the usual
+# case is a single dict hit with no stripping.
+_RANKS = dict(RANK_TO_VALUE)
+_RANKS.update({str(v): v for v in range(1, 14)})
+_RANKS.update({v: v for v in range(1, 14)})  # JSON puzzles may store ints
+_RANKS.update({f"{q}{k}{q}": v for k, v in _RANKS.items() if isinstance(k, str) for q in "'\""})
+
+def rank_to_value(rank: str) -> int:
+    return _RANKS[rank] if rank in _RANKS else _rank_to_value_slow(rank)
+
 def value_to_rank(v: int) -> str:
     return VALUE_TO_RANK.get(int(v), str(int(v)))
 
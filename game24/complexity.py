@@ -4,11 +4,15 @@ _RANK_TOKEN_RE = re.compile(r'(?<![A-Za-z0-9_.])([AaJjQqKk])(?![A-Za-z0-9_.])')
 _RANK_TOKEN_MAP = {"A":"1","J":"11","Q":"12","K":"13"}
 
 # add 'T' to the map and regex (T for Ten)
-_RANK_TOKEN_RE = re.compile(r'(?<![A-Za-z0-9_.])([AaJjQqKkTt])(?![A-Za-z0-9_.])')
+_RANK_TOKEN_RE = re.compile(r'(?a)(?<![A-Za-z0-9_.])([AaJjQqKkTt])(?![A-Za-z0-9_.])')
 _RANK_TOKEN_MAP = {"A":"1","J":"11","Q":"12","K":"13","T":"10"}
+_RANK_SUB = {**_RANK_TOKEN_MAP, **{k.lower(): v for k, v in _RANK_TOKEN_MAP.items()}}
+
+def _repl(m) -> str:
+    return _RANK_SUB[m.group(1)]
 
 def preprocess_ranks(expr: str) -> str:
-    return _RANK_TOKEN_RE.sub(lambda m: _RANK_TOKEN_MAP[m.group(1).upper()], expr)
+    return _RANK_TOKEN_RE.sub(_repl, expr)
 
 class _DepthVisitor(ast.NodeVisitor):
     def __init__(self): self.max_depth = 0
@@ -1,7 +1,8 @@
 import json
-import re
+import os
 import sys
-from typing import List, Dict, Any
+import tempfile
+from typing import List, Dict, Any, Optional
 
 RANK_TO_VALUE = {
     "A": 1, "J": 11, "Q": 12, "K": 13,
@@ -11,7 +12,7 @@ RANK_TO_VALUE = {
     "a": 1, "j": 11, "q": 12, "k": 13,
 }
 
-def rank_to_value(rank: str) -> int:
+def _rank_to_value_slow(rank) -> int:
     r = rank.strip().strip('"').strip("'")
     if r in RANK_TO_VALUE:
         return RANK_TO_VALUE[r]
@@ -20,51 +21,121 @@ def rank_to_value(rank: str) -> int:
         return int(r)
     raise ValueError(f"Unrecognized rank: {rank}")
 
-def parse_block(block: str, idx: int) -> Dict[str, Any]:
+# Every common spelling of a rank mapped straight to its value, so the usual
+# case is a single dict hit with no stripping.
+_RANKS = dict(RANK_TO_VALUE)
+_RANKS.update({str(v): v for v in range(1, 14)})
+_RANKS.update({f"{q}{k}{q}": v for k, v in _RANKS.items() if isinstance(k, str) for q in "'\""})
+
+def rank_to_value(rank: str) -> int:
+    return _RANKS[rank] if rank in _RANKS else _rank_to_value_slow(rank)
+
+def split_blocks(content: bytes) -> List[bytes]:
+    """Split file content into the text between "Question ..." header lines."""
+    blocks: List[bytes] = []
+    cur: List[bytes] = []
+    for line in content.splitlines():
+        if line.startswith(b"Question"):
+            blocks.append(b"\n".join(cur))
+            cur = []
+        else:
+            cur.append(line)
+    blocks.append(b"\n".join(cur))
+    return blocks
+
+_WS = frozenset(b" \t\n\r\x0b\x0c")
+
+def _open_bracket(block: bytes, key: bytes, low: Optional[bytes] = None) -> int:
+    """Index of the "[" following `key` (as with `key\s*\[`), or -1.
+
+    Only whitespace may separate the label from "["; a label without a
+    bracket is skipped in favour of a later one. Pass `low=block.lower()` to
+    match the label case-insensitively.
+    """
+    hay = block if low is None else low
+    n = len(block)
+    i = hay.find(key)
+    while i >= 0:
+        j = i + len(key)
+        while j < n and block[j] in _WS:
+            j += 1
+        if j < n and block[j] == 0x5B:  # [
+            return j
+        i = hay.find(key, i + 1)
+    return -1
+
+def _field(block: bytes, key: bytes, low: Optional[bytes] = None) -> Optional[bytes]:
+    """Return the text between the brackets following `key`, e.g. b"level: [Easy]" -> b"Easy"."""
+    j = _open_bracket(block, key, low)
+    if j < 0:
+        return None
+    k = block.find(b"]", j + 1)
+    return None if k < 0 else block[j + 1:k]
+
+def _scan_quoted(s: bytes) -> List[bytes]:
+    """Return the contents of every '...' or "..." item in `s`."""
+    out: List[bytes] = []
+    i, n = 0, len(s)
+    while i < n:
+        c = s[i]  # an int when indexing bytes
+        if c == 0x27 or c == 0x22:  # ' or "
+            j = s.find(c, i + 1)
+            if j < 0:
+                break  # unterminated quote
+            out.append(s[i + 1:j])
+            i = j + 1
+        else:
+            i += 1
+    return out
+
+def parse_block(block: bytes, idx: int) -> Dict[str, Any]:
     """
-    Parse one block of:
+    Parse one block (raw bytes) of:
         cards:      ['A', 'A', 'A', '10']
         level:      [Easy]
         solutions:  [(expr1; expr2; ...)]
+    Only the extracted values are decoded.
     """
+    # "level:"/"solutions:" labels are case-insensitive; lower the block once
+    low = block.lower()
+
     # cards
-    m_cards = re.search(r"cards:\s*\[(.*?)\]", block, flags=re.S)
-    if not m_cards:
-        raise ValueError(f"Block #{idx}: missing 'cards' line.\n{block}")
-    cards_inner = m_cards.group(1)
+    cards_inner = _field(block, b"cards:")
+    if cards_inner is None:
+        raise ValueError(f"Block #{idx}: missing 'cards' line.\n{block.decode('utf-8', 'replace')}")
     # Extract items inside quotes; tolerate single or double quotes
-    card_ranks = re.findall(r"'([^']*)'|\"([^\"]*)\"", cards_inner)
-    # card_ranks is list of tuples; pick non-empty group from each
-    ranks = [(a if a else b) for (a, b) in card_ranks]
-    if not ranks:
+    raw_ranks = _scan_quoted(cards_inner)
+    if not raw_ranks:
         # As a fallback, split by comma if quotes were omitted
-        ranks = [c.strip().strip("'").strip('"') for c in cards_inner.split(",") if c.strip()]
+        raw_ranks = [c.strip().strip(b"'").strip(b'"') for c in cards_inner.split(b",") if c.strip()]
+    # Only a handful of distinct ranks exist; share one string object per rank
+    ranks = [sys.intern(r.decode("utf-8")) for r in raw_ranks]
 
     # level
-    m_level = re.search(r"level:\s*\[(.*?)\]", block, flags=re.S | re.I)
-    if not m_level:
-        raise ValueError(f"Block #{idx}: missing 'level' line.\n{block}")
-    level_raw = m_level.group(1).strip()
+    level_raw = _field(block, b"level:", low)
+    if level_raw is None:
+        raise ValueError(f"Block #{idx}: missing 'level' line.\n{block.decode('utf-8', 'replace')}")
+    level_raw = level_raw.strip()
     # Remove quotes if any
-    level = level_raw.strip("'").strip('"')
+    level = sys.intern(level_raw.strip(b"'").strip(b'"').decode("utf-8"))
 
     # solutions
-    m_solutions = re.search(r"solutions:\s*\[(.*?)\]", block, flags=re.S | re.I)
-    if not m_solutions:
-        raise ValueError(f"Block #{idx}: missing 'solutions' line.\n{block}")
-    sols_inner = m_solutions.group(1).strip()
+    sols_inner = _field(block, b"solutions:", low)
+    if sols_inner is None:
+        raise ValueError(f"Block #{idx}: missing 'solutions' line.\n{block.decode('utf-8', 'replace')}")
+    sols_inner = sols_inner.strip()
 
     solutions: List[str] = []
     if sols_inner:
         # Examples look like: (expr1; expr2; expr3)
         # Remove a single wrapping pair of parentheses if the entire string is enclosed
-        if sols_inner.startswith("(") and sols_inner.endswith(")"):
+        if sols_inner.startswith(b"(") and sols_inner.endswith(b")"):
             sols_inner = sols_inner[1:-1].strip()
 
         # Now split by semicolons that separate expressions
-        parts = [p.strip() for p in sols_inner.split(";")]
+        parts = [p.strip() for p in sols_inner.split(b";")]
         # Filter empties and preserve original math punctuation/parentheses
-        solutions = [p for p in parts if p]
+        solutions = [p.decode("utf-8") for p in parts if p]
 
     data = {
         "id": idx,                         # sequential id (starting at 1)
@@ -76,27 +147,44 @@ def parse_block(block: str, idx: int) -> Dict[str, Any]:
     return data
 
 def parse_24pt_file(txt_path: str, json_path: str) -> None:
-    with open(txt_path, "r", encoding="utf-8") as f:
+    # Read as bytes: only the extracted values get decoded
+    with open(txt_path, "rb") as f:
         content = f.read().strip()
 
-    # Split blocks by one or more blank lines
-    raw_blocks = re.split(r"Question.*?\s*\n+", content)
-    print("raw_blocks ",len(raw_blocks))
-    print(raw_blocks[27:30])
+    # Split blocks on the "Question ..." header lines
+    raw_blocks = split_blocks(content)
     # Filter out empty/whitespace-only blocks
     blocks = [b.strip() for b in raw_blocks if b.strip()]
 
-    results: List[Dict[str, Any]] = []
-    for i, block in enumerate(blocks, start=1):
-        # Skip non-block noise if any
-        if not re.search(r"cards:\s*\[", block, flags=re.I):
-            continue
-        results.append(parse_block(block, i))
-
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
-
-    print(f"✅ Parsed {len(results)} puzzles → {json_path}")
+    # Write each puzzle as soon as it is parsed instead of building the whole
+    # list first; the layout matches json.dump(results, indent=2).
+    # Stream into a temp file next to the target and swap it in at the end, so
+    # a bad block never leaves a truncated file over the previous output.
+    count = 0
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(json_path)), suffix=".tmp")
+    try:
+        with open(fd, "w", encoding="utf-8") as f:
+            for i, block in enumerate(blocks, start=1):
+                # Skip non-block noise if any: no "cards:" label followed by "["
+                # (any case, as with the old re.I guard)
+                low = block.lower()
+                if b"cards:" not in low or _open_bracket(block, b"cards:", low) < 0:
+                    continue
+                data = parse_block(block, i)
+                f.write("[\n  " if count == 0 else ",\n  ")
+                f.write(json.dumps(data, indent=2, ensure_ascii=False).replace("\n", "\n  "))
+                count += 1
+            f.write("\n]" if count else "[]")
+        # mkstemp creates the file 0600; give it the mode open() would have
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, json_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    print(f"✅ Parsed {count} puzzles → {json_path}")
 
 def main():
     # CLI: python convert_24pt_txt_to_json.py input.txt output.json
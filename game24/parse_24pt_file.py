@@ -1,28 +1,42 @@
 import json
 import re
 
+# Legacy "Question <n>: a, b, c, d" / "Level -- <level>" format.
+# The cards:/level:/solutions: format is handled by convert_24pt_txt_to_json.py.
 def parse_24pt_file(txt_path, json_path):
     puzzles = []
-    with open(txt_path, 'r', encoding='utf-8') as f:
+    # Parsed as bytes; only the extracted solutions/level are decoded
+    with open(txt_path, 'rb') as f:
         content = f.read()
 
-    # Split each question block
-    blocks = re.split(r'Question (\d+): ', content)[1:]  # Skip leading empty
-    for i in range(0, len(blocks), 2):
-        case_id = int(blocks[i])
-        block = blocks[i + 1]
+    # Split each question block on its "Question <n>: " header line
+    blocks = []
+    cur = None
+    for line in content.splitlines():
+        if line.startswith(b'Question '):
+            head, sep, rest = line.partition(b': ')
+            num = head[len(b'Question '):]
+            if sep and num.isdigit():
+                cur = [rest]
+                blocks.append((int(num), cur))
+                continue
+        if cur is not None:
+            cur.append(line)
+
+    for case_id, lines in blocks:
+        block = b'\n'.join(lines)
 
         # Parse card numbers
-        card_match = re.match(r'([\d,\s]+)', block)
-        cards = list(map(int, card_match.group(1).split(','))) if card_match else []
+        card_match = re.match(rb'([\d,\s]+)', block)
+        cards = list(map(int, card_match.group(1).split(b','))) if card_match else []
 
         # Find all solutions
-        solution_lines = re.findall(r'\d+\.\s+(.+)', block)
-        solutions = [s.strip() for s in solution_lines]
+        solution_lines = re.findall(rb'\d+\.\s+(.+)', block)
+        solutions = [s.strip().decode('utf-8') for s in solution_lines]
 
         # Find level
-        level_match = re.search(r'Level\s+--\s+(\w+)', block)
-        level = level_match.group(1) if level_match else 'Unknown'
+        level_match = re.search(rb'Level\s+--\s+(\w+)', block)
+        level = level_match.group(1).decode('ascii') if level_match else 'Unknown'
 
         puzzle = {
             "case_id": case_id,
@@ -37,6 +51,7 @@ def parse_24pt_file(txt_path, json_path):
         json.dump(puzzles, f, indent=2)
     print(f"✅ Converted {len(puzzles)} puzzles to JSON → {json_path}")
 
-# Example usage:
-parse_24pt_file("test3.txt", "solution.json")
+if __name__ == "__main__":
+    # Example usage:
+    parse_24pt_file("test3.txt", "solution.json")
 
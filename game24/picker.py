@@ -37,6 +37,34 @@ class QuestionPicker:
         for p in puzzles:
             vals = get_values(p)
             self.index.append((p, vals, combo_key_numeric(vals)))
+        self._build_pools()
+
+    def _build_pools(self):
+        """Classify every puzzle once; pick() then only filters out recent ones."""
+        self.easy_pool = []
+        self.med_pool_with_simple = []
+        self.med_pool = []
+        self.hard_pool = []
+        self.med_pool_with_hard = []
+        self.no_sol_pool = []
+
+        for item in self.index:
+            p = item[0]
+            lvl = str(p.get("level","")).strip()
+            has_sol = has_solution(p)
+
+            if not has_sol:
+                self.no_sol_pool.append(item)
+            if lvl == "Easy" and has_sol:
+                self.easy_pool.append(item)
+            if lvl == "Medium":
+                self.med_pool.append(item)
+                if has_sol and puzzle_has_simple_solution(p):
+                    self.med_pool_with_simple.append(item)
+                if has_sol and puzzle_has_hard_solution(p):
+                    self.med_pool_with_hard.append(item)
+            if lvl == "Hard":
+                self.hard_pool.append(item)
 
     def _not_recent(self, key: str) -> bool:
         return key not in self.recent
@@ -111,32 +139,13 @@ class QuestionPicker:
         print(f"inside pick, Picker request level={level}")
 
         level = level.lower()
-        easy_pool = []
-        med_pool_with_simple = []
-        med_pool = []
-        hard_pool = []
-        med_pool_with_hard = []
-        no_sol_pool = []
-
-        for (p, vals, key) in self.index:
-            lvl = str(p.get("level","")).strip()
-            #lvl = str(p.get("level","")).strip().lower()  # Normalize level case
-            has_sol = has_solution(p)
-            unique_vals = all_values_unique(vals)
-
-            if not has_sol:
-                no_sol_pool.append((p, vals, key))
-            if lvl == "Easy" and has_sol:
-                easy_pool.append((p, vals, key))
-            if lvl == "Medium":
-                med_pool.append((p, vals, key))
-                if has_sol and puzzle_has_simple_solution(p):
-                    med_pool_with_simple.append((p, vals, key))
-                if has_sol and puzzle_has_hard_solution(p):
-                    med_pool_with_hard.append((p, vals, key))
-            if lvl == "Hard":
-                #if unique_vals:
-                hard_pool.append((p, vals, key))
+        # Pools are fixed per picker (see _build_pools); only recency changes
+        easy_pool = self.easy_pool
+        med_pool_with_simple = self.med_pool_with_simple
+        med_pool = self.med_pool
+        hard_pool = self.hard_pool
+        med_pool_with_hard = self.med_pool_with_hard
+        no_sol_pool = self.no_sol_pool
 
         #print(f"after load, hard pool len={len(easy_pool)}; {len(med_pool)}; {len(hard_pool)}")
         if level in ("easy","1"):
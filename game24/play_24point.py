@@ -322,13 +322,13 @@ def play_round(p: Dict[str, Any], seqno: int) -> Dict[str, Any]:
         pass
     
     values_needed = get_values(p)
-    start = time.time()
+    start = time.perf_counter()
     attempts = 0
     used_help = False
 
     while True:
         user = input("Your answer (or 'help'/'help all'/'skip'/'time'/'stop'): ").strip()
-        now = time.time()
+        now = time.perf_counter()
         time_used = now - start
         if not user:
             continue
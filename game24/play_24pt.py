@@ -7,14 +7,23 @@ import operator
 import sys
 import csv
 import re
-from typing import Dict, Any, List
+import functools
+from collections import Counter
+from typing import Dict, Any, List, Tuple
 
 # --- imports from your helper modules ---
-from card_utils import rank_to_value, value_to_rank, get_values, get_ranks_for_display
+from card_utils import value_to_rank, get_values, get_ranks_for_display
 from picker import QuestionPicker
 from complexity import preprocess_ranks
 from safety_eval import safe_eval_bounded, UnsafeExpression
 
+# orjson is optional; json.loads accepts the same bytes input
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
 
 # ----------------------
 # Config / constants
@@ -31,18 +40,24 @@ GREETING = "24point - game — use 4 numbers to formula to 24 points"
 # ----------------------
 
 def load_puzzles(json_path: str) -> List[Dict[str, Any]]:
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    with open(json_path, "rb") as f:
+        data = _loads(f.read())
     if not isinstance(data, list):
         raise ValueError("JSON root must be a list.")
+    # Puzzles never change after load: precompute what each round displays/checks
+    for p in data:
+        vals = get_values(p)                          # e.g., [3,5,6,11]
+        p["_sorted_values"] = tuple(sorted(vals))
+        p["_cards_line"] = fmt_cards_line_raw(get_ranks_for_display(p), vals)
     return data
 
 
-def fmt_cards_line(p: Dict[str, Any]) -> str:
-    ranks = get_ranks_for_display(p)                  # e.g., ["3","5","6","J"]
-    values = [rank_to_value(r) for r in ranks]        # e.g., [3,5,6,11]
+def fmt_cards_line_raw(ranks: List[str], values: List[int]) -> str:
     return f"[{', '.join(ranks)}]   (values: {', '.join(map(str, values))})"
 
+def fmt_cards_line(p: Dict[str, Any]) -> str:
+    return p["_cards_line"]                           # set by load_puzzles
+
 def fmt_secs(sec: float) -> str:
     if sec < 60:
         return f"{sec:.1f}s"
@@ -50,14 +65,10 @@ def fmt_secs(sec: float) -> str:
     s = sec - 60 * m
     return f"{m}m{s:04.1f}s"
 
-def multiset_equal(a: List[int], b: List[int]) -> bool:
-    return sorted(a) == sorted(b)
-
-def explain_multiset_mismatch(need: List[int], used: List[int]) -> str:
-    from collections import Counter
-    need_c, used_c = Counter(need), Counter(used)
+def explain_multiset_mismatch(need_c: Counter, used: List[int]) -> str:
+    used_c = Counter(used)
     extra, missing = [], []
-    for k in sorted(set(list(need_c.keys()) + list(used_c.keys()))):
+    for k in sorted(need_c.keys() | used_c.keys()):
         diff = used_c[k] - need_c[k]
         if diff > 0:
             extra.append(f"{k}x{diff}")
@@ -68,29 +79,31 @@ def explain_multiset_mismatch(need: List[int], used: List[int]) -> str:
     if extra:   out.append("extra " + ", ".join(extra))
     return "; ".join(out) if out else "numbers mismatch"
 
-# Extract constants used in user's expression (for multiset check)
-def extract_constants(expr: str) -> List[int]:
-    expr = preprocess_ranks(expr).replace("^", "**")
+# Extract constants used in user's expression (for multiset check).
+# `expr` must already be passed through preprocess_ranks.
+# Cached per input: players often resubmit the same expression.
+@functools.lru_cache(maxsize=512)
+def extract_constants(expr: str) -> Tuple[int, ...]:
+    expr = expr.replace("^", "**")
     try:
         tree = ast.parse(expr, mode="eval")
     except Exception as e:
         raise ValueError(f"Invalid expression: {e}")
     consts: List[int] = []
-    class V(ast.NodeVisitor):
-        def visit_Constant(self, node: ast.Constant):
-            if isinstance(node.value, (int, float)):
-                v = node.value
-                if isinstance(v, float):
-                    if abs(v - round(v)) < 1e-12:
-                        consts.append(int(round(v)))
-                    else:
-                        raise ValueError("Only integer constants are allowed (card values 1–13).")
-                else:
-                    consts.append(int(v))
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Constant):
+            continue
+        v = node.value
+        if isinstance(v, int):
+            consts.append(int(v))
+        elif isinstance(v, float):
+            if abs(v - round(v)) < 1e-12:
+                consts.append(int(round(v)))
             else:
-                raise ValueError("Only numeric constants allowed.")
-    V().visit(tree)
-    return consts
+                raise ValueError("Only integer constants are allowed (card values 1–13).")
+        else:
+            raise ValueError("Only numeric constants allowed.")
+    return tuple(consts)
 
 # ----------------------
 # UI
@@ -126,14 +139,15 @@ def play_round(p: Dict[str, Any], seqno: int) -> Dict[str, Any]:
       attempts(int), used_help(bool), solved_via('formula'|'no-solution'|None)
     """
     print(f"\nQ{seqno} — Cards: {fmt_cards_line(p)}")
-    values_needed = get_values(p)
-    start = time.time()
+    sorted_needed = p["_sorted_values"]
+    need_c = Counter(sorted_needed)
+    start = time.perf_counter()
     attempts = 0
     used_help = False
 
     while True:
         user = input("Your answer (or 'help'/'help all'/'skip'/'time'/'stop'): ").strip()
-        now = time.time()
+        now = time.perf_counter()
         time_used = now - start
         if not user:
             continue
@@ -212,21 +226,23 @@ def play_round(p: Dict[str, Any], seqno: int) -> Dict[str, Any]:
                 continue
 
         # Validate card usage first (must match the four values as a multiset)
+        pre = preprocess_ranks(user)
         try:
-            used_consts = extract_constants(user)
+            used_consts = extract_constants(pre)
         except ValueError as e:
             print(f"Invalid expression: {e}")
             continue
 
-        if not multiset_equal(used_consts, values_needed):
+        used_sorted = tuple(sorted(used_consts))
+        if used_sorted != sorted_needed:
             print("❌ You must use exactly these four numbers once each.")
-            print(f"Expected: {sorted(values_needed)}; Found: {sorted(used_consts)} "
-                  f"({explain_multiset_mismatch(values_needed, used_consts)})")
+            print(f"Expected: {list(sorted_needed)}; Found: {list(used_sorted)} "
+                  f"({explain_multiset_mismatch(need_c, used_consts)})")
             continue
 
         # Evaluate numeric expression (hardened)
         try:
-            val = safe_eval_bounded(preprocess_ranks(user))
+            val = safe_eval_bounded(pre)
         except UnsafeExpression as e:
             print(f"Invalid expression: {e}")
             continue
@@ -255,24 +271,24 @@ def play_round(p: Dict[str, Any], seqno: int) -> Dict[str, Any]:
 def print_and_save_report(records: List[Dict[str, Any]], csv_path: str = "session_report.csv"):
     if not records:
         return
-    print("\nFinal Report")
-    print("seqno, question, solved, time, attempts, used_help, solved_via")
+    lines = ["\nFinal Report\n", "seqno, question, solved, time, attempts, used_help, solved_via\n"]
     for r in records:
         solved = "Yes" if r.get("solved") else "No"
         used_help = "Yes" if r.get("used_help") else "No"
         solved_via = r.get("solved_via") or ""
-        print(f"{r['seqno']}, {r['question']}, {solved}, {fmt_secs(r['time_sec'])}, "
-              f"{r.get('attempts', 0)}, {used_help}, {solved_via}")
+        lines.append(f"{r['seqno']}, {r['question']}, {solved}, {fmt_secs(r['time_sec'])}, "
+                     f"{r.get('attempts', 0)}, {used_help}, {solved_via}\n")
+    sys.stdout.write("".join(lines))
 
     with open(csv_path, "w", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
         w.writerow(["seqno", "question", "solved", "time_sec", "attempts", "used_help", "solved_via"])
-        for r in records:
-            w.writerow([
-                r["seqno"], r["question"], int(bool(r.get("solved"))),
-                f"{r['time_sec']:.3f}", r.get("attempts", 0),
-                int(bool(r.get("used_help"))), r.get("solved_via") or ""
-            ])
+        w.writerows(
+            (r["seqno"], r["question"], int(bool(r.get("solved"))),
+             f"{r['time_sec']:.3f}", r.get("attempts", 0),
+             int(bool(r.get("used_help"))), r.get("solved_via") or "")
+            for r in records
+        )
     print(f"\nSaved report to {csv_path}")
 
 # ----------------------
@@ -6,7 +6,9 @@ import operator
 import sys
 import csv
 import re
-from typing import Dict, Any, List
+import functools
+from collections import Counter
+from typing import Dict, Any, List, Tuple, Callable
 
 # ----------------------
 # Safe expression eval
@@ -37,12 +39,23 @@ NO_SOLUTION_TOKENS = {"no sol", "nosol", "no solution", "0", "-1"}
 
 # Allow A/J/Q/K directly in formulas
 _RANK_TOKEN_MAP = {"A": "1", "J": "11", "Q": "12", "K": "13"}
-_RANK_TOKEN_RE = re.compile(r'(?<![A-Za-z0-9_.])([AaJjQqKk])(?![A-Za-z0-9_.])')
+_RANK_TOKEN_RE = re.compile(r'(?a)(?<![A-Za-z0-9_.])([AaJjQqKk])(?![A-Za-z0-9_.])')
+_RANK_SUB = {**_RANK_TOKEN_MAP, **{k.lower(): v for k, v in _RANK_TOKEN_MAP.items()}}
+
+def _repl(m) -> str:
+    return _RANK_SUB[m.group(1)]
+
+# Fast path: when no rank letter touches another identifier character, every
+# rank letter is a standalone token and one str.translate rewrites them all.
+_RANK_TRANS = str.maketrans(_RANK_SUB)
+_RANK_ADJ_RE = re.compile(r'(?a)[A-Za-z0-9_.][AaJjQqKk]|[AaJjQqKk][A-Za-z0-9_.]')
+
+# Everything a valid answer can contain; anything else is rejected before parsing
+_ALLOWED_CHARS = frozenset("0123456789AJQKajqk+-*/^() .\t")
 
 def preprocess_ranks(expr: str) -> str:
-    def _repl(m):
-        ch = m.group(1).upper()
-        return _RANK_TOKEN_MAP[ch]
+    if not _RANK_ADJ_RE.search(expr):
+        return expr.translate(_RANK_TRANS)
     return _RANK_TOKEN_RE.sub(_repl, expr)
 
 def rank_to_value(rank: str) -> int:
@@ -56,57 +69,69 @@ def rank_to_value(rank: str) -> int:
 def value_to_rank(v: int) -> str:
     return VALUE_TO_RANK.get(int(v), str(int(v)))
 
-def extract_constants(expr: str) -> List[int]:
-    """Return all numeric constants used in the expression as integers."""
-    expr = preprocess_ranks(expr).replace("^", "**")
-    try:
-        tree = ast.parse(expr, mode="eval")
-    except Exception as e:
-        raise ValueError(f"Invalid expression: {e}")
-
-    consts: List[int] = []
-
-    class Visitor(ast.NodeVisitor):
-        def visit_Constant(self, node: ast.Constant):
-            if isinstance(node.value, (int, float)):
-                v = node.value
-                if isinstance(v, float):
-                    if abs(v - round(v)) < 1e-12:
-                        consts.append(int(round(v)))
-                    else:
-                        raise ValueError("Only integer constants are allowed (card values 1–13).")
-                else:
-                    consts.append(int(v))
+def _build(node, consts: List[int]) -> Callable[[], Any]:
+    """Turn a validated AST node into a closure that computes its value,
+    appending every integer constant met along the way to `consts`."""
+    if isinstance(node, ast.Expression):
+        return _build(node.body, consts)
+    if isinstance(node, ast.Constant):
+        v = node.value
+        if isinstance(v, float):
+            if abs(v - round(v)) < 1e-12:
+                consts.append(int(round(v)))
             else:
-                raise ValueError("Only numeric constants allowed.")
-
-    Visitor().visit(tree)
-    return consts
+                raise ValueError("Only integer constants are allowed (card values 1–13).")
+        elif isinstance(v, int):
+            consts.append(int(v))
+        else:
+            raise ValueError("Only numeric constants allowed.")
+        return lambda: v
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _ALLOWED_UNARYOPS:
+        uop = _ALLOWED_UNARYOPS[type(node.op)]
+        operand = _build(node.operand, consts)
+        return lambda: uop(operand())
+    if isinstance(node, ast.BinOp) and type(node.op) in _ALLOWED_BINOPS:
+        op = _ALLOWED_BINOPS[type(node.op)]
+        left = _build(node.left, consts)
+        right = _build(node.right, consts)
+        return lambda: op(left(), right())
+    raise ValueError("Unsupported expression.")
+
+@functools.lru_cache(maxsize=1024)
+def _compile(expr: str) -> Tuple[Tuple[int, ...], Callable[[], Any]]:
+    """Preprocess, parse and walk `expr` once; return its integer constants
+    and a closure computing its value.
+
+    Cached on the raw input so a resubmitted expression skips lexing, parsing
+    and the walk entirely. The cache is process-wide and LRU-bounded, so it
+    also serves retries within a round; play_round needs no cache of its own.
+    """
+    bad = set(expr) - _ALLOWED_CHARS
+    if bad:
+        raise ValueError(f"invalid character(s): {' '.join(sorted(bad))}")
+    tree = ast.parse(preprocess_ranks(expr).replace("^", "**"), mode="eval")
+    consts: List[int] = []
+    fn = _build(tree, consts)
+    return tuple(consts), fn
 
-def safe_eval(expr: str) -> float:
-    """Evaluate arithmetic expression safely with + - * / ** and parentheses."""
-    expr = preprocess_ranks(expr).replace("^", "**")
+def compile_and_collect(expr: str) -> Tuple[List[int], Callable[[], Any]]:
+    """Return (constants used, closure computing the value) from a single parse.
 
-    def _eval(node):
-        if isinstance(node, ast.Expression):
-            return _eval(node.body)
-        if isinstance(node, ast.Constant):
-            if isinstance(node.value, (int, float)):
-                return node.value
-            raise ValueError("Only numeric constants allowed.")
-        if isinstance(node, ast.UnaryOp) and type(node.op) in _ALLOWED_UNARYOPS:
-            return _ALLOWED_UNARYOPS[type(node.op)](_eval(node.operand))
-        if isinstance(node, ast.BinOp) and type(node.op) in _ALLOWED_BINOPS:
-            left = _eval(node.left)
-            right = _eval(node.right)
-            op = _ALLOWED_BINOPS[type(node.op)]
-            return op(left, right)
-        raise ValueError("Unsupported expression.")
+    Check the constants before calling the closure: a wrong-card answer such
+    as 9**9**9 must be rejected without being evaluated.
+    """
+    try:
+        consts, fn = _compile(expr)
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {e}")
+    return list(consts), fn
 
+def run_compiled(fn: Callable[[], Any]) -> float:
+    """Call a closure from compile_and_collect; errors surface as ValueError
+    (ZeroDivisionError passes through)."""
     try:
-        tree = ast.parse(expr, mode="eval")
-        return float(_eval(tree))
-    except ZeroDivisionError:
+        return float(fn())
+    except (ZeroDivisionError, ValueError):
         raise
     except Exception as e:
         raise ValueError(f"Invalid expression: {e}")
@@ -119,6 +144,13 @@ def load_puzzles(json_path: str) -> List[Dict[str, Any]]:
         data = json.load(f)
     if not isinstance(data, list):
         raise ValueError("JSON root must be a list of puzzles.")
+    # Precompute what difficulty filtering needs so it never re-derives it
+    for p in data:
+        vals = get_values(p)
+        p["_values"] = vals
+        p["_level"] = level_of(p)
+        p["_no_sol"] = has_no_solution(p)
+        p["_no12"] = no_1_or_2(vals)
     return data
 
 def get_values(p: Dict[str, Any]) -> List[int]:
@@ -159,26 +191,27 @@ def level_of(p: Dict[str, Any]) -> str:
 def no_1_or_2(values: List[int]) -> bool:
     return 1 not in values and 2 not in values
 
-def filter_base(puzzles: List[Dict[str, Any]], level_choice: str) -> List[Dict[str, Any]]:
-    level_choice = level_choice.lower()
-    base = []
-    if level_choice in ("easy", "1"):
-        for p in puzzles:
-            if level_of(p) in ("Easy", "Medium") or has_no_solution(p):
-                base.append(p)
-    elif level_choice in ("medium", "2"):
-        for p in puzzles:
-            if level_of(p) == "Medium" or has_no_solution(p):
-                base.append(p)
-    elif level_choice in ("hard", "3"):
-        for p in puzzles:
-            vals = get_values(p)
-            if level_of(p) == "Hard" or no_1_or_2(vals) or has_no_solution(p):
-                base.append(p)
-    else:
+DIFFICULTY_KEYS = {"easy": "easy", "1": "easy", "medium": "medium", "2": "medium", "hard": "hard", "3": "hard"}
+
+def index_by_difficulty(puzzles: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Partition puzzles (as returned by load_puzzles) into per-difficulty pools in one pass."""
+    index: Dict[str, List[Dict[str, Any]]] = {"easy": [], "medium": [], "hard": []}
+    for p in puzzles:
+        lvl, no_sol = p["_level"], p["_no_sol"]
+        if lvl in ("Easy", "Medium") or no_sol:
+            index["easy"].append(p)
+        if lvl == "Medium" or no_sol:
+            index["medium"].append(p)
+        if lvl == "Hard" or p["_no12"] or no_sol:
+            index["hard"].append(p)
+    return index
+
+def filter_base(index: Dict[str, List[Dict[str, Any]]], level_choice: str) -> List[Dict[str, Any]]:
+    key = DIFFICULTY_KEYS.get(level_choice.lower())
+    if key is None:
         raise ValueError("Invalid difficulty selection.")
-    random.shuffle(base)
-    return base
+    # A copy: game_loop consumes it. Order does not matter, rounds are drawn at random.
+    return list(index[key])
 
 # ----------------------
 # UI + timing
@@ -222,14 +255,9 @@ def fmt_secs(sec: float) -> str:
     s = sec - 60 * m
     return f"{m}m{s:04.1f}s"
 
-def multiset_equal(a: List[int], b: List[int]) -> bool:
-    return sorted(a) == sorted(b)
-
-def explain_multiset_mismatch(need: List[int], used: List[int]) -> str:
-    from collections import Counter
-    need_c, used_c = Counter(need), Counter(used)
+def explain_multiset_mismatch(need_c: Counter, used_c: Counter) -> str:
     extra, missing = [], []
-    for k in sorted(set(list(need_c.keys()) + list(used_c.keys()))):
+    for k in sorted(need_c.keys() | used_c.keys()):
         diff = used_c[k] - need_c[k]
         if diff > 0:
             extra.append(f"{k}x{diff}")
@@ -247,16 +275,17 @@ def play_round(p: Dict[str, Any], seqno: int) -> Dict[str, Any]:
       attempts(int), used_help(bool), solved_via('formula'|'no-solution'|None)
     """
     ranks_display = get_ranks_for_display(p)
-    values_needed = get_values(p)
+    values_needed = p["_values"]
+    need_c = Counter(values_needed)
     print(f"\nQ{seqno} — Cards: {cards_line_for_prompt(p)}")
 
-    start = time.time()
+    start = time.perf_counter()
     attempts = 0
     used_help = False
 
     while True:
         user = input("Your answer (or 'help'/'help all'/'skip'/'time'/'stop'): ").strip()
-        now = time.time()
+        now = time.perf_counter()
         time_used = now - start
         if not user:
             continue
@@ -334,22 +363,25 @@ def play_round(p: Dict[str, Any], seqno: int) -> Dict[str, Any]:
                 print("❌ A solution exists for this puzzle. Use 'help'/'help all' to see it.")
                 continue
 
-        # Validate card usage first (must match the four values as a multiset)
+        # Parse once for both the card check and the evaluation
+        # (a retried string is served from _compile's cache)
         try:
-            used_consts = extract_constants(user)
+            used_consts, fn = compile_and_collect(user)
         except ValueError as e:
             print(f"Invalid expression: {e}")
             continue
 
-        if not multiset_equal(used_consts, values_needed):
+        # Card usage must match the four values as a multiset
+        used_c = Counter(used_consts)
+        if used_c != need_c:
             print("❌ You must use exactly these four numbers once each.")
             print(f"Expected: {sorted(values_needed)}; Found: {sorted(used_consts)} "
-                  f"({explain_multiset_mismatch(values_needed, used_consts)})")
+                  f"({explain_multiset_mismatch(need_c, used_c)})")
             continue
 
-        # Evaluate numeric expression
+        # Evaluate only once the cards check out
         try:
-            val = safe_eval(user)
+            val = run_compiled(fn)
         except ZeroDivisionError:
             print("Invalid: division by zero.")
             continue
@@ -377,21 +409,22 @@ def print_and_save_report(records: List[Dict[str, Any]], csv_path: str = "sessio
 
     print("\nFinal Report")
     print("seqno, question, solved, time, attempts, used_help, solved_via")
-    for r in records:
-        solved = "Yes" if r.get("solved") else "No"
-        used_help = "Yes" if r.get("used_help") else "No"
-        solved_via = r.get("solved_via") or ""
-        print(f"{r['seqno']}, {r['question']}, {solved}, {fmt_secs(r['time_sec'])}, "
-              f"{r.get('attempts', 0)}, {used_help}, {solved_via}")
-
+    # One pass: each record is printed and written to the CSV together
     with open(csv_path, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
         writer.writerow(["seqno", "question", "solved", "time_sec", "attempts", "used_help", "solved_via"])
         for r in records:
+            solved = bool(r.get("solved"))
+            used_help = bool(r.get("used_help"))
+            solved_via = r.get("solved_via") or ""
+            attempts = r.get("attempts", 0)
+            time_sec = r["time_sec"]
+            print(f"{r['seqno']}, {r['question']}, {'Yes' if solved else 'No'}, {fmt_secs(time_sec)}, "
+                  f"{attempts}, {'Yes' if used_help else 'No'}, {solved_via}")
             writer.writerow([
-                r["seqno"], r["question"], int(bool(r.get("solved"))),
-                f"{r['time_sec']:.3f}", r.get("attempts", 0),
-                int(bool(r.get("used_help"))), r.get("solved_via") or ""
+                r["seqno"], r["question"], int(solved),
+                f"{time_sec:.3f}", attempts,
+                int(used_help), solved_via
             ])
     print(f"\nSaved report to {csv_path}")
 
@@ -402,7 +435,7 @@ def game_loop(puzzles: List[Dict[str, Any]]):
 
     show_greeting()
     sel = pick_difficulty()
-    base = filter_base(puzzles, sel)
+    base = filter_base(index_by_difficulty(puzzles), sel)
     if not base:
         print("No puzzles match that difficulty. Exiting.")
         return
@@ -414,6 +447,9 @@ def game_loop(puzzles: List[Dict[str, Any]]):
     seqno = 1
 
     while base:
+        # Draw a random remaining puzzle: swap it to the end and pop, O(1) per round
+        i = random.randrange(len(base))
+        base[i], base[-1] = base[-1], base[i]
         p = base.pop()
         rec = play_round(p, seqno)
         records.append(rec)
@@ -1,5 +1,5 @@
 # game24/safety_eval.py
-import ast, operator, math
+import ast, operator, math, functools
 
 MAX_EXPR_LEN = 200
 MAX_AST_NODES = 120
@@ -25,6 +25,9 @@ def _count_nodes(tree) -> int:
 def _is_int_like(x: float, eps: float = 1e-12) -> bool:
     return abs(x - round(x)) < eps
 
+# Pure function of `expr`: cache results so repeated answers skip parse/eval
+# (rejections raise and are not cached).
+@functools.lru_cache(maxsize=1024)
 def safe_eval_bounded(expr: str) -> float:
     if len(expr) > MAX_EXPR_LEN:
         raise UnsafeExpression("Expression too long.")
@@ -7,7 +7,7 @@ Fixes 403 by sending a compliant User-Agent per:
 https://meta.wikimedia.org/wiki/User-Agent_policy
 
 Usage:
-  pip install requests cairosvg
+  pip install requests resvg_py      # or: pip install requests cairosvg
   python download_and_build_cards.py --out ./cards_png --height 300 --email you@example.com --project "24point game"
 """
 
@@ -15,15 +15,24 @@ import argparse
 import time
 import re
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from pathlib import Path
 from typing import Dict, Optional, List
 
 import requests
 
+# Rasterizer: prefer resvg (native, much faster); fall back to cairosvg
+try:
+    import resvg_py
+except ImportError:
+    resvg_py = None
 try:
     import cairosvg
 except ImportError:
-    print("ERROR: cairosvg not installed. Run: pip install cairosvg", file=sys.stderr)
+    cairosvg = None
+if resvg_py is None and cairosvg is None:
+    print("ERROR: no SVG rasterizer installed. Run: pip install resvg_py (or cairosvg)", file=sys.stderr)
     sys.exit(1)
 
 COMMONS_API = "https://commons.wikimedia.org/w/api.php"
@@ -45,12 +54,35 @@ SUIT_MAP = {
 }
 VALID_CODES = {f"{r}{s}" for r in (["A"]+[str(i) for i in range(2,11)]+["J","Q","K"]) for s in "SHDC"}
 TOKENIZE = re.compile(r"[A-Za-z0-9]+")
+_DIGIT_RANKS = frozenset(str(i) for i in range(2, 11))
+_NUM_TO_RANK = {"1": "A", "11": "J", "12": "Q", "13": "K"}
+REQUESTS_PER_SEC = 5.0  # be polite: shared cap across all download threads
 
 # ---- Networking helpers ----
-def build_session(email: str, project: Optional[str]) -> requests.Session:
+class RateLimiter:
+    """Space calls at least 1/rate seconds apart, across threads."""
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            at = max(now, self.next_at)
+            self.next_at = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+LIMITER = RateLimiter(REQUESTS_PER_SEC)
+
+def build_session(email: str, project: Optional[str], pool_size: int = 10) -> requests.Session:
     ua = f"{(project or '24point-game')}/1.0 (contact: {email}); python-requests"
     s = requests.Session()
     s.headers.update({"User-Agent": ua})
+    # keep-alive connections shared by the download threads
+    adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+    s.mount("https://", adapter)
     return s
 
 def backoff_sleep(attempt: int):
@@ -61,6 +93,7 @@ def req_get_json(session: requests.Session, params: Dict, max_retries: int = 5)
     params.setdefault("format", "json")
     params.setdefault("origin", "*")  # CORS-friendly; harmless for server-side too
     for attempt in range(max_retries):
+        LIMITER.wait()
         r = session.get(COMMONS_API, params=params, timeout=30)
         if r.status_code in (200,):
             return r.json()
@@ -95,23 +128,33 @@ def list_category_files(session: requests.Session, category: str) -> List[str]:
             break
     return titles
 
-def get_original_url(session: requests.Session, file_title: str) -> Optional[str]:
-    data = req_get_json(session, {
-        "action": "query",
-        "titles": file_title,
-        "prop": "imageinfo",
-        "iiprop": "url",
-    })
-    pages = data.get("query", {}).get("pages", {})
-    for _pid, page in pages.items():
-        infos = page.get("imageinfo")
-        if infos:
-            return infos[0].get("url")
-    return None
+def get_original_urls_bulk(session: requests.Session, file_titles: List[str], batch: int = 50) -> Dict[str, str]:
+    """Map each file title to its original URL, asking for up to 50 titles per API call."""
+    urls: Dict[str, str] = {}
+    for i in range(0, len(file_titles), batch):
+        chunk = file_titles[i:i + batch]
+        data = req_get_json(session, {
+            "action": "query",
+            "titles": "|".join(chunk),
+            "prop": "imageinfo",
+            "iiprop": "url",
+        })
+        query = data.get("query", {})
+        # The API answers with normalized titles (e.g. "_" -> " "); map them back
+        to_requested = {t: t for t in chunk}
+        for n in query.get("normalized", []):
+            to_requested[n.get("to")] = n.get("from")
+        for _pid, page in query.get("pages", {}).items():
+            infos = page.get("imageinfo")
+            title = to_requested.get(page.get("title"), page.get("title"))
+            if infos and infos[0].get("url"):
+                urls[title] = infos[0]["url"]
+    return urls
 
 def download(session: requests.Session, url: str, dest: Path, max_retries: int = 5, chunk_size: int = 65536):
     dest.parent.mkdir(parents=True, exist_ok=True)
     for attempt in range(max_retries):
+        LIMITER.wait()
         r = session.get(url, stream=True, timeout=60)
         if r.status_code == 200:
             with open(dest, "wb") as f:
@@ -137,24 +180,39 @@ def parse_code_from_title(file_title: str) -> Optional[str]:
             rank = RANK_MAP[t]
         elif t in SUIT_MAP and suit is None:
             suit = SUIT_MAP[t]
-        elif t.isdigit():
-            if t in [str(i) for i in range(2, 11)]:
-                rank = rank or t
-            elif t == "1":
-                rank = rank or "A"
-            elif t == "11":
-                rank = rank or "J"
-            elif t == "12":
-                rank = rank or "Q"
-            elif t == "13":
-                rank = rank or "K"
+        elif t in _DIGIT_RANKS:
+            rank = rank or t
+        elif t in _NUM_TO_RANK:
+            rank = rank or _NUM_TO_RANK[t]
     if rank and suit:
         code = f"{rank}{suit}"
         return code if code in VALID_CODES else None
     return None
 
+def png_height(png_path: Path) -> Optional[int]:
+    """Pixel height from the PNG's IHDR chunk, or None if it isn't a readable PNG."""
+    try:
+        with open(png_path, "rb") as f:
+            head = f.read(24)
+    except OSError:
+        return None
+    if len(head) < 24 or head[:8] != b"\x89PNG\r\n\x1a\n" or head[12:16] != b"IHDR":
+        return None
+    return int.from_bytes(head[20:24], "big")
+
+def is_fresh(png_path: Path, svg_path: Path, height: int) -> bool:
+    """True if png_path was rendered at `height` px and is not older than its source SVG (if kept)."""
+    if not png_path.exists():
+        return False
+    if png_height(png_path) != height:
+        return False
+    return not svg_path.exists() or png_path.stat().st_mtime >= svg_path.stat().st_mtime
+
 def svg_to_png(svg_path: Path, png_path: Path, height: int):
     png_path.parent.mkdir(parents=True, exist_ok=True)
+    if resvg_py is not None:
+        png_path.write_bytes(bytes(resvg_py.svg_to_bytes(svg_path=str(svg_path), height=height)))
+        return
     cairosvg.svg2png(url=str(svg_path), write_to=str(png_path), output_height=height)
 
 # ---- Main ----
@@ -165,9 +223,11 @@ def main():
     ap.add_argument("--keep-svg", action="store_true", help="Keep downloaded SVGs alongside PNGs")
     ap.add_argument("--email", required=True, help="Contact email for User-Agent (required by Wikimedia)")
     ap.add_argument("--project", default="24point-game", help="Project name in User-Agent")
+    ap.add_argument("--workers", type=int, default=8, help="Concurrent downloads, default 8")
+    ap.add_argument("--force", action="store_true", help="Rebuild every PNG, even if it looks up to date")
     args = ap.parse_args()
 
-    session = build_session(args.email, args.project)
+    session = build_session(args.email, args.project, pool_size=args.workers)
     out_dir = Path(args.out)
     svg_dir = out_dir / "_svgs"
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -180,36 +240,56 @@ def main():
     print(f"Found {len(titles)} files. Downloading SVGs and converting…")
 
     seen_codes = set()
+    jobs = {}  # code -> title; first title wins so threads never share an output file
     for title in titles:
         code = parse_code_from_title(title)
         if not code:
             # Skip non-face files (backs/jokers) if present
             continue
+        if code in jobs or code in seen_codes:
+            continue
+        if not args.force and is_fresh(out_dir / f"{code}.png", svg_dir / f"{code}.svg", args.height):
+            # Already built from the current SVG at this height: no lookup, download or render
+            seen_codes.add(code)
+            print(f"{code:4}  {title}  ->  {code}.png (up to date)")
+            continue
+        jobs[code] = title
 
-        url = get_original_url(session, title)
+    urls = get_original_urls_bulk(session, list(jobs.values()))
+
+    def fetch(code: str, title: str) -> Optional[Path]:
+        url = urls.get(title)
         if not url:
             print(f"Skip (no URL): {title}")
-            continue
-
+            return None
         svg_path = svg_dir / f"{code}.svg"
-        png_path = out_dir / f"{code}.png"
-
         if not svg_path.exists():
             try:
                 download(session, url, svg_path)
             except Exception as e:
                 print(f"Download failed for {title}: {e}", file=sys.stderr)
-                continue
+                return None
+        return svg_path
 
-        try:
-            svg_to_png(svg_path, png_path, args.height)
-        except Exception as e:
-            print(f"SVG->PNG failed for {svg_path.name}: {e}", file=sys.stderr)
-            continue
+    # Network-bound: overlap requests on threads (LIMITER keeps the overall rate polite)
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        svg_paths = dict(zip(jobs, pool.map(fetch, jobs.keys(), jobs.values())))
 
-        seen_codes.add(code)
-        print(f"{code:4}  {title}  ->  {png_path.name}")
-        time.sleep(0.3)  # be polite
+    # CPU-bound: rasterize in separate processes
+    with ProcessPoolExecutor() as pool:
+        futures = {
+            pool.submit(svg_to_png, svg_path, out_dir / f"{code}.png", args.height): code
+            for code, svg_path in svg_paths.items() if svg_path
+        }
+        for fut in as_completed(futures):
+            code = futures[fut]
+            try:
+                fut.result()
+            except Exception as e:
+                print(f"SVG->PNG failed for {svg_paths[code].name}: {e}", file=sys.stderr)
+                continue
+            seen_codes.add(code)
+            print(f"{code:4}  {jobs[code]}  ->  {code}.png")
 
     if not args.keep_svg and svg_dir.exists():
         for p in svg_dir.glob("*.svg"):
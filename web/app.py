@@ -1,13 +1,32 @@
 # web/app.py
 from fastapi import FastAPI, Query, HTTPException, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 import json as _json
 import random
-import hashlib
+import re
+import zlib
+import functools
+import itertools
+
+# orjson is optional: faster JSON for puzzle loading and every API response
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = _json.loads
+    def _dumps(obj: Any) -> bytes:
+        return _json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class _JSONResponse(JSONResponse):
+    # Plain JSONResponse rendered with _dumps (FastAPI's ORJSONResponse is deprecated)
+    def render(self, content: Any) -> bytes:
+        return _dumps(content)
 
 # ---- Import your existing game modules
 from game24.picker import QuestionPicker
@@ -21,39 +40,123 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_JSON_PATH = BASE_DIR / "data" / "answers.json"
 PICTURES_ROOT = BASE_DIR / "pictures"    # filesystem path to your images root
 DEFAULT_THEME = "classic"
+INDEX_HTML = (Path(__file__).parent / "static" / "index.html").read_bytes()   # served as-is by "/"
 
 # ---- App init & static mounts
-app = FastAPI(title="Game24 API")
-SEQ = 0
+app = FastAPI(title="Game24 API", default_response_class=_JSONResponse)
+# Level 1 is nearly free on CPU and still shrinks big 'help all' lists several-fold
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=1)
 
 # Serve pictures via /assets/<theme>/<code>.png
+# (dev convenience: in production nginx serves these directly, see README)
 app.mount("/assets", StaticFiles(directory=str(PICTURES_ROOT)), name="assets")
 # Serve the single HTML page from /static
 app.mount("/static", StaticFiles(directory=str(Path(__file__).parent / "static")), name="static")
 
 # ---- Load puzzles once
-with open(DATA_JSON_PATH, "r", encoding="utf-8") as f:
-    PUZZLES: List[Dict[str, Any]] = _json.load(f)
+# Read-only after load: keep the collection and each solution list as tuples
+PUZZLES: Tuple[Dict[str, Any], ...] = tuple(
+    {**p, "solutions": tuple(p.get("solutions") or ())}
+    for p in _loads(DATA_JSON_PATH.read_bytes())
+)
+
+# Sorted values -> puzzle (first one wins, as with the old linear scan).
+# PUZZLES never changes after load, so /api/restart leaves this alone.
+# The fields /api/next sends back are fixed per puzzle: precompute them too.
+PUZZLE_BY_KEY: Dict[Tuple[int, ...], Dict[str, Any]] = {}
+for _p in PUZZLES:
+    _p["_values"] = tuple(get_values(_p))
+    _p["_ranks"] = tuple(get_ranks_for_display(_p))
+    _p["_question"] = f"[{', '.join(_p['_ranks'])}] (values: {', '.join(map(str, _p['_values']))})"
+    _p["_example_solution"] = _p["solutions"][0] if _p["solutions"] else None
+    PUZZLE_BY_KEY.setdefault(tuple(sorted(_p["_values"])), _p)
 
 # One picker instance (session-like behavior within a process)
 PICKER = QuestionPicker(PUZZLES, recent_window=60, medium_no_sol_target=0.10)
 
-# Simple per-process sequence number
-NEXT_SEQ = 0
+# Simple per-process sequence number (count's __next__ is a single C call)
+_SEQ_NEXT = itertools.count(1).__next__
+
+# Answers that claim "no solution"; longer inputs skip the lower() entirely
+_NOSOL = frozenset({"no sol", "nosol", "no solution", "0", "-1"})
+_NOSOL_MAXLEN = max(map(len, _NOSOL))
+
+# Numeric literals as Python tokenizes them once letters are ruled out
+# (no exponents, hex, underscores or complex suffixes can appear).
+_NUM_RE = re.compile(r'(?a)\d+(?:\.\d*)?|\.\d+')
+_NAME_RE = re.compile(r'[A-Za-z_]')
+
+def _literal_int(tok: str) -> int:
+    # Rounded like the parsed constant: int literals go through float(int), so
+    # a huge one raises OverflowError instead of silently becoming inf
+    return int(round(float(int(tok) if tok.isdigit() else tok)))
+
+@functools.lru_cache(maxsize=4096)
+def _seed_for(values: Tuple[int, ...], salt: str) -> int:
+    # Not security-sensitive: crc32 is a cheap, process-stable seed
+    return zlib.crc32(f"{values}|{salt}".encode()) & 0xFFFFFFFF
 
 def _rng_for(values: List[int], salt: str = "") -> random.Random:
-    seed_src = f"{tuple(values)}|{salt}"
-    seed = int(hashlib.sha256(seed_src.encode()).hexdigest(), 16) % (10**8)
-    return random.Random(seed)
-
-def _find_puzzle_by_values(values_needed: List[int]) -> Optional[Dict[str, Any]]:
-    tgt = sorted(int(x) for x in values_needed)
-    for p in PUZZLES:
-        if sorted(get_values(p)) == tgt:
-            return p
-    return None
-
-# ---- Models
+    # Cache the seed, not the Random: a Random's state changes as it is used
+    return random.Random(_seed_for(tuple(values), salt))
+
+@functools.lru_cache(maxsize=8192)
+def _cards_for(values: Tuple[int, ...], theme: str) -> Tuple[Dict[str, Any], ...]:
+    """Card images for a puzzle's values in display order. The RNG is seeded
+    from the same inputs, so the pick is a pure function and safe to cache;
+    callers must treat the result as read-only."""
+    rng = _rng_for(list(values), salt=theme)
+    return tuple(pick_card_images(list(values), theme=theme, pictures_root=str(PICTURES_ROOT), rng=rng))
+
+def _values_key(values: List[Any]) -> Tuple[int, ...]:
+    return tuple(sorted(map(int, values)))
+
+def _find_puzzle_by_values(key: Tuple[int, ...]) -> Optional[Dict[str, Any]]:
+    """`key` is the sorted values tuple from _values_key."""
+    return PUZZLE_BY_KEY.get(key)
+
+@functools.lru_cache(maxsize=4096)
+def _help_json(key: Tuple[int, ...], want_all: bool) -> bytes:
+    """Serialized /api/help body for a sorted values key.
+
+    The single-solution example is fixed per puzzle at load time, so the
+    response is a pure function of its arguments and safe to cache.
+    """
+    p = PUZZLE_BY_KEY.get(key)
+    if not p or not p["solutions"]:
+        payload = {"solutions": [], "has_solution": False}
+    elif want_all:
+        payload = {"solutions": p["solutions"], "has_solution": True}
+    else:
+        payload = {"solutions": [p["_example_solution"]], "has_solution": True}
+    return _dumps(payload)
+
+async def _json_body(request: Request) -> Dict[str, Any]:
+    """Decode a POST body with a 'values' list of ints (in place of a request model)."""
+    try:
+        body = _loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Request body must be JSON.")
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=422, detail="Request body must be a JSON object.")
+    vals = body.get("values")
+    if not isinstance(vals, list) or not all(type(v) is int for v in vals):
+        raise HTTPException(status_code=422, detail="'values' must be a list of integers.")
+    return body
+
+# ---- Models (OpenAPI docs only: bodies are checked by _json_body)
+class CheckRequest(BaseModel):
+    values: List[int]
+    answer: str
+
+class HelpRequest(BaseModel):
+    values: List[int]
+    all: Optional[bool] = False
+
+def _request_body(model: type) -> Dict[str, Any]:
+    # openapi_extra for a route that reads the Request itself
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": model.model_json_schema()}}}}
+
 class NextResponse(BaseModel):
     seq: int
     ranks: List[str]
@@ -61,33 +164,32 @@ class NextResponse(BaseModel):
     images: List[Dict[str, Any]]  # {"code":"AS","url":"/assets/classic/AS.png"}
     question: str                 # "[A, 2, 2, 8] (values: 1, 2, 2, 8)"
 
-class CheckRequest(BaseModel):
-    values: List[int]
-    answer: str
-
 class CheckResponse(BaseModel):
     ok: bool
     value: Optional[float] = None
     reason: Optional[str] = None
     kind: Optional[str] = None  # "formula" | "no-solution" | "help-available"
 
-class HelpRequest(BaseModel):
-    values: List[int]
-    all: Optional[bool] = False
-
 class HelpResponse(BaseModel):
     solutions: List[str]
     has_solution: bool
 
+def _check_result(ok: bool, value: Optional[float] = None, reason: Optional[str] = None,
+                  kind: Optional[str] = None) -> Dict[str, Any]:
+    # Every CheckResponse field, nulls included, as the model used to emit them
+    return {"ok": ok, "value": value, "reason": reason, "kind": kind}
+
 # ---- Routes
 
 @app.get("/", response_class=HTMLResponse)
 def root():
-    index = Path(__file__).parent / "static" / "index.html"
-    return HTMLResponse(index.read_text(encoding="utf-8"))
+    return HTMLResponse(INDEX_HTML)
 
-@app.get("/api/next", response_model=NextResponse)
-def api_next(
+# Hot routes build their dicts in-house: skip response-model validation and
+# keep the models only for the OpenAPI docs. They only touch in-memory data,
+# so they are async and run on the event loop without a threadpool hop.
+@app.get("/api/next", response_model=None, responses={200: {"model": NextResponse}})
+async def api_next(
     level: str = Query("easy", description="Difficulty level"),
     theme: str = Query("classic", description="Card theme")
 ):
@@ -100,110 +202,101 @@ def api_next(
     #print(f"Selected puzzle difficulty level: {p.get('level', 'unknown')}")  # Debug log
     #print(f"Selected puzzle str: {str(p)}")  # Debug log
     
-    values = get_values(p)
-    ranks = get_ranks_for_display(p)
+    values = p["_values"]
+    ranks = p["_ranks"]
     
-    rng = _rng_for(values, salt=theme)
-    cards = pick_card_images(values, theme=theme, pictures_root=str(PICTURES_ROOT), rng=rng)
+    cards = _cards_for(values, theme)
     
-    global NEXT_SEQ
-    NEXT_SEQ += 1
+    seq = _SEQ_NEXT()
+    prefix = f"/assets/{theme}/"
 
     return {
-        "seq": NEXT_SEQ,
+        "seq": seq,
         "ranks": ranks,
         "values": values,
-        "images": [{"code": c["code"], "url": f"/assets/{theme}/{c['code']}.png"} for c in cards],
-        "question": f"[{', '.join(ranks)}] (values: {', '.join(str(v) for v in values)})",
-        "difficulty": p.get("difficulty", "unknown")  # Add this line for debugging
+        "images": [{"code": (code := c["code"]), "url": prefix + code + ".png"} for c in cards],
+        "question": p["_question"],
     }
 
 
 
-@app.post("/api/check", response_model=CheckResponse)
-def api_check(body: CheckRequest):
-    values_needed = sorted(int(x) for x in body.values)
-    ans = (body.answer or "").strip()
+@app.post("/api/check", response_model=None, responses={200: {"model": CheckResponse}},
+          openapi_extra=_request_body(CheckRequest))
+async def api_check(request: Request):
+    body = await _json_body(request)
+    ans = body.get("answer")
+    if not isinstance(ans, str):
+        raise HTTPException(status_code=422, detail="'answer' must be a string.")
+    key = _values_key(body["values"])
+    ans = ans.strip()
 
     # No-solution claim
-    if ans.lower() in {"no sol", "nosol", "no solution", "0", "-1"}:
-        puzzle = _find_puzzle_by_values(values_needed)
+    if len(ans) <= _NOSOL_MAXLEN and ans.lower() in _NOSOL:
+        puzzle = _find_puzzle_by_values(key)
         sols_exist = bool(puzzle and puzzle.get("solutions"))
         if not sols_exist:
-            return {"ok": True, "value": None, "kind": "no-solution"}
+            return _check_result(True, kind="no-solution")
         else:
-            return {
-                "ok": False,
-                "reason": "Try 'help' to see a solution example, 'help all' to see all solutions.",
-                "kind": "help-available",
-            }
-
-    # Extract integer constants to enforce multiset usage
-    import ast
-    def extract_constants(expr: str) -> List[int]:
-        expr2 = preprocess_ranks(expr).replace("^", "**")
-        tree = ast.parse(expr2, mode="eval")
-        consts: List[int] = []
-        class V(ast.NodeVisitor):
-            def visit_Constant(self, node: ast.Constant):
-                if isinstance(node.value, (int, float)):
-                    v = int(round(float(node.value)))
-                    consts.append(v)
-        V().visit(tree)
-        return consts
-
+            return _check_result(
+                False,
+                reason="Try 'help' to see a solution example, 'help all' to see all solutions.",
+                kind="help-available",
+            )
+
+    # Extract integer constants to enforce multiset usage. This runs before
+    # any length or structure check (safe_eval_bounded below does those), so
+    # the regex only has to find the literals; a malformed answer that slips
+    # through here is still rejected by the parser.
+    pre = preprocess_ranks(ans)
+    if _NAME_RE.search(pre):
+        return _check_result(False, reason="Invalid expression: only numbers, A/J/Q/K, + - * / ^ and parentheses are allowed.")
     try:
-        used_consts = sorted(extract_constants(ans))
-    except Exception as e:
-        return {"ok": False, "reason": f"Invalid expression: {e}"}
+        used_consts = tuple(sorted(map(_literal_int, _NUM_RE.findall(pre))))
+    except (OverflowError, ValueError) as e:
+        return _check_result(False, reason=f"Invalid expression: {e}")
 
-    if used_consts != values_needed:
-        return {"ok": False, "reason": f"You must use exactly these numbers {values_needed}. Found {used_consts}."}
+    if used_consts != key:
+        return _check_result(False, reason=f"You must use exactly these numbers {list(key)}. Found {list(used_consts)}.")
 
     # Evaluate safely
     try:
-        val = safe_eval_bounded(preprocess_ranks(ans))
+        val = safe_eval_bounded(pre)
     except UnsafeExpression as e:
-        return {"ok": False, "reason": str(e)}
+        return _check_result(False, reason=str(e))
     except ZeroDivisionError:
-        return {"ok": False, "reason": "Division by zero."}
+        return _check_result(False, reason="Division by zero.")
     except Exception as e:
-        return {"ok": False, "reason": f"Invalid expression: {e}"}
+        return _check_result(False, reason=f"Invalid expression: {e}")
 
     if abs(val - 24.0) < 1e-9:
-        return {"ok": True, "value": val, "kind": "formula"}
+        return _check_result(True, value=val, kind="formula")
     else:
-        return {"ok": False, "value": val, "reason": f"Not 24 (got {val})."}
+        return _check_result(False, value=val, reason=f"Not 24 (got {val}).")
 
-@app.post("/api/help", response_model=HelpResponse)
-def api_help(body: HelpRequest):
-    try:
-        p = _find_puzzle_by_values(body.values)
-        if not p:
-            return {"solutions": [], "has_solution": False}
-
-        sols = list(p.get("solutions", []))
-        if not sols:
-            return {"solutions": [], "has_solution": False}
-
-        if body.all:
-            return {"solutions": sols, "has_solution": True}
-        return {"solutions": [random.choice(sols)], "has_solution": True}
-    except Exception as e:
-        return {"solutions": [], "has_solution": False}
+@app.post("/api/help", response_model=None, responses={200: {"model": HelpResponse}},
+          openapi_extra=_request_body(HelpRequest))
+async def api_help(request: Request):
+    body = await _json_body(request)
+    show_all = body.get("all")
+    if show_all is None:
+        show_all = False    # HelpRequest.all is Optional: null means False
+    elif not isinstance(show_all, bool):
+        raise HTTPException(status_code=422, detail="'all' must be a boolean.")
+    key = _values_key(body["values"])
+    return Response(_help_json(key, show_all), media_type="application/json")
 
 
 @app.post("/api/restart")
 def api_restart():
-    global PICKER, NEXT_SEQ
+    global PICKER, _SEQ_NEXT
     try:
         PICKER = QuestionPicker(PUZZLES, recent_window=60, medium_no_sol_target=0.10)
-        NEXT_SEQ = 0
-        return JSONResponse({"ok": True, "msg": "Pool reset"})
+        _SEQ_NEXT = itertools.count(1).__next__
+        return _JSONResponse({"ok": True, "msg": "Pool reset"})
     except Exception as e:
-        return JSONResponse({"ok": False, "error": str(e)}, status_code=500)
+        return _JSONResponse({"ok": False, "error": str(e)}, status_code=500)
 
 @app.post("/api/exit")
 def api_exit():
-    return JSONResponse({"ok": True, "msg": "Session ended"})
+    return _JSONResponse({"ok": True, "msg": "Session ended"})
 